@@ -6,6 +6,11 @@ from agno.tools.serpapi import SerpApiTools
 from agno.models.google import Gemini
 from datetime import datetime
 from dotenv import load_dotenv
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+from cache import TTLCache
+from request_log import log_request
 
 load_dotenv()
 
@@ -13,6 +18,13 @@ SERPAPI_KEY = os.getenv("SERPAPI_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 
+FLIGHT_CACHE_TTL = int(os.getenv("FLIGHT_CACHE_TTL", "1800"))
+BOOKING_TOKEN_CACHE_TTL = int(os.getenv("BOOKING_TOKEN_CACHE_TTL", "1800"))
+RESEARCH_CACHE_TTL = int(os.getenv("RESEARCH_CACHE_TTL", "86400"))
+flight_cache = TTLCache("flights", FLIGHT_CACHE_TTL)
+booking_token_cache = TTLCache("booking_tokens", BOOKING_TOKEN_CACHE_TTL)
+research_cache = TTLCache("research", RESEARCH_CACHE_TTL)
+
 def format_datetime(iso_string):
     """Formats an ISO datetime string to a more readable format."""
     try:
@@ -21,26 +33,53 @@ def format_datetime(iso_string):
     except (ValueError, TypeError):
         return "N/A"
 
-def fetch_flights(source, destination, departure_date, return_date):
-    """Fetches flight data from the Google Flights API via SerpApi."""
+def flight_cache_key(source, destination, departure_date, return_date=None):
+    """Builds the flight cache key for a search."""
+    return (source, destination, str(departure_date), str(return_date) if return_date else None)
+
+def flight_params(source, destination, departure_date, return_date=None):
+    """Builds the SerpApi Google Flights parameters. Without a return date a one-way search is made."""
     params = {
         "engine": "google_flights",
         "departure_id": source,
         "arrival_id": destination,
         "outbound_date": str(departure_date),
-        "return_date": str(return_date),
         "currency": "INR",
         "hl": "en",
         "api_key": SERPAPI_KEY
     }
+    if return_date:
+        params["return_date"] = str(return_date)
+    else:
+        params["type"] = "2"
+    return params
+
+def search_flights(source, destination, departure_date, return_date=None):
+    """Fetches flight data from the Google Flights API via SerpApi, bypassing the cache."""
     try:
-        search = serpapi.search(params)
-        results = search.as_dict()
-        return results
+        search = serpapi.search(flight_params(source, destination, departure_date, return_date))
+        return search.as_dict()
     except Exception as e:
         print(f"Error fetching flights: {e}")
         return {}
 
+def fetch_flights(source, destination, departure_date, return_date=None):
+    """Fetches flight data, serving it from the flight cache when warm.
+
+    Results are cached for FLIGHT_CACHE_TTL seconds and every call is logged
+    for the cache warmer.
+    """
+    cache_key = flight_cache_key(source, destination, departure_date, return_date)
+    cached = flight_cache.get(cache_key)
+    log_request("flights", dict(zip(("source", "destination", "departure_date", "return_date"), cache_key)), cached is not None)
+    if cached is not None:
+        return cached
+
+    results = search_flights(source, destination, departure_date, return_date)
+    if results.get("best_flights"):
+        flight_cache.set(cache_key, results)
+    return results
+
 def extract_cheapest_flights(flight_data):
     """Extracts the top 3 cheapest flights from the flight data."""
     best_flights = flight_data.get("best_flights", [])
@@ -49,8 +88,23 @@ def extract_cheapest_flights(flight_data):
     sorted_flights = sorted(best_flights, key=lambda x: x.get("price", float("inf")))[:3]
     return sorted_flights
 
-def fetch_booking_token(flight_details, params):
-    """Fetches a booking token for a specific flight."""
+def summarize_flights(flights):
+    """Returns a compact summary of flights, keeping only what is needed to describe them."""
+    summary = []
+    for flight in flights:
+        legs = flight.get("flights", [{}])
+        summary.append({
+            "airline": legs[0].get("airline", "Unknown Airline"),
+            "price_inr": flight.get("price"),
+            "departure": legs[0].get("departure_airport", {}).get("time"),
+            "arrival": legs[-1].get("arrival_airport", {}).get("time"),
+            "duration_minutes": flight.get("total_duration"),
+            "stops": len(legs) - 1,
+        })
+    return summary
+
+def search_booking_token(flight_details, params):
+    """Fetches a booking token for a specific flight, bypassing the cache."""
     try:
         departure_token = flight_details.get("departure_token", "")
         if departure_token:
@@ -66,14 +120,46 @@ def fetch_booking_token(flight_details, params):
         print(f"Error fetching booking token: {e}")
         return None
 
+def fetch_booking_token(flight_details, params):
+    """Fetches a booking token for a specific flight, serving it from the cache when warm."""
+    departure_token = flight_details.get("departure_token", "")
+    if not departure_token:
+        return None
+    cached = booking_token_cache.get(departure_token)
+    log_request("booking_token", {}, cached is not None)
+    if cached is not None:
+        return cached
+
+    booking_token = search_booking_token(flight_details, params)
+    if booking_token:
+        booking_token_cache.set(departure_token, booking_token)
+    return booking_token
+
+class Activity(BaseModel):
+    """A single scheduled activity within an itinerary day."""
+    time: str = Field(..., pattern=r"^([01]\d|2[0-3]):[0-5]\d$", description="Start time in 24-hour HH:MM format.")
+    title: str = Field(..., description="Short name of the activity.")
+    location: str = Field(..., description="Where the activity takes place.")
+    description: str = Field(..., description="One or two sentences about the activity.")
+    duration_minutes: int = Field(..., gt=0, description="Expected duration in minutes.")
+    estimated_cost: float = Field(..., ge=0, description="Estimated cost per person in INR.")
+
+class DayPlan(BaseModel):
+    """One day of a structured itinerary."""
+    day: int = Field(..., ge=1, description="Day number, starting at 1.")
+    title: str = Field(..., description="Short headline for the day, e.g. 'Old Delhi heritage walk'.")
+    activities: List[Activity] = Field(..., min_length=1, description="Activities in chronological order.")
+    transport: str = Field(..., description="Transportation options and travel time estimates for the day.")
+    total_cost: float = Field(..., ge=0, description="Estimated total cost per person for the day in INR.")
+    notes: Optional[str] = Field(None, description="Optional tips for the day.")
+
 # Initialize AI Agents
 researcher = Agent(
     name="Researcher",
     instructions=[
-        "Identify the travel destination specified by the user.",
-        "Gather detailed information on the destination, including climate, culture, and safety tips.",
+        "Gather detailed information on the destination city and country given by the user, including climate, culture, and safety tips.",
         "Find popular attractions, landmarks, and must-visit places.",
-        "Search for activities that match the user’s interests and travel style.",
+        "Cover activities for a wide range of interests, budgets and travel styles within the requested theme.",
         "Prioritize information from reliable sources and official travel guides.",
         "Provide well-structured summaries with key insights and recommendations."
     ],
@@ -86,12 +172,14 @@ planner = Agent(
     name="Planner",
     instructions=[
         "Gather details about the user's travel preferences and budget.",
-        "Create a detailed itinerary with scheduled activities and estimated costs.",
-        "Ensure the itinerary includes transportation options and travel time estimates.",
-        "Optimize the schedule for convenience and enjoyment.",
-        "Present the itinerary in a structured format."
+        "Plan only the single day of the itinerary requested by the user, with scheduled activities and estimated costs.",
+        "Ensure the day includes transportation options and travel time estimates.",
+        "Choose from the researched places those that match the traveler's interests, budget and travel requirements.",
+        "Use the summaries of the other days as context and avoid repeating their activities.",
+        "Optimize the schedule for convenience and enjoyment."
     ],
     model=Gemini(id="gemini-2.0-flash-exp"),
+    response_model=DayPlan,
     add_datetime_to_instructions=True,
 )
 
@@ -107,4 +195,50 @@ hotel_restaurant_finder = Agent(
     model=Gemini(id="gemini-2.0-flash-exp"),
     tools=[SerpApiTools(api_key=SERPAPI_KEY)],
     add_datetime_to_instructions=True,
-)
\ No newline at end of file
+)
+
+def research_prompt(destination, travel_theme):
+    """Builds the researcher prompt.
+
+    It depends only on the destination and theme so results are shared across
+    travelers and can be warmed; per-traveler preferences go to the planner.
+    """
+    return (
+        f"Research the best attractions and activities in {destination} for a {travel_theme.lower()} trip. "
+        f"List enough places, one per line, for a trip of up to two weeks, with visa and safety notes for visitors."
+    )
+
+def hotel_restaurant_prompt(destination, travel_theme, budget, hotel_rating):
+    """Builds the hotel & restaurant finder prompt. Activity preferences are left to the planner."""
+    return (
+        f"Find the best hotels and restaurants near popular attractions in {destination} for a {travel_theme.lower()} trip. "
+        f"Budget: {budget}. Hotel Rating: {hotel_rating}."
+    )
+
+# Research kinds, each an agent and the prompt builder for its parameters
+RESEARCH_TASKS = {
+    "research": (researcher, research_prompt),
+    "hotels_restaurants": (hotel_restaurant_finder, hotel_restaurant_prompt),
+}
+
+def run_research(kind, params):
+    """Runs a research agent, bypassing the cache, and returns its content."""
+    agent, build_prompt = RESEARCH_TASKS[kind]
+    return agent.run(build_prompt(**params), stream=False).content
+
+def fetch_research(kind, params):
+    """Runs a research agent, serving its content from the research cache when warm.
+
+    Results are cached for RESEARCH_CACHE_TTL seconds and every call is logged
+    for the cache warmer.
+    """
+    cache_key = (kind, params)
+    cached = research_cache.get(cache_key)
+    log_request(kind, params, cached is not None)
+    if cached is not None:
+        return cached
+
+    content = run_research(kind, params)
+    if content:
+        research_cache.set(cache_key, content)
+    return content
@@ -0,0 +1,155 @@
+import csv
+import os
+import unicodedata
+from bisect import bisect_left
+from typing import NamedTuple, Tuple
+
+AIRPORTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "airports.csv")
+
+class Airport(NamedTuple):
+    code: str
+    city: str
+    country: str
+    name: str
+    aliases: Tuple[str, ...]
+
+    @property
+    def known(self):
+        return self.code in AIRPORTS_BY_CODE
+
+    @property
+    def place(self):
+        """City and country for prompts, or just the code for airports not in the index."""
+        return f"{self.city}, {self.country}" if self.country else self.city
+
+    @property
+    def label(self):
+        if not self.known:
+            return f"{self.code} — not in the local airport index, searched as an IATA code"
+        return f"{self.city} ({self.code}) — {self.name}, {self.country}"
+
+def normalize(text):
+    """Lowercases and strips accents, punctuation and extra spaces for matching."""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    text = "".join(ch if ch.isalnum() else " " for ch in text.lower())
+    return " ".join(text.split())
+
+def _load_airports(path=AIRPORTS_FILE):
+    """Loads the bundled airport table."""
+    with open(path, newline="", encoding="utf-8") as f:
+        return [
+            Airport(row["code"], row["city"], row["country"], row["name"], tuple(a for a in row["aliases"].split("|") if a))
+            for row in csv.DictReader(f)
+        ]
+
+AIRPORTS = _load_airports()
+AIRPORTS_BY_CODE = {airport.code: airport for airport in AIRPORTS}
+
+# Sorted (key, airport position) pairs: codes, cities, aliases and airport names.
+# Prefix lookups are a binary search followed by a short forward scan.
+_index = sorted(
+    (normalize(key), position)
+    for position, airport in enumerate(AIRPORTS)
+    for key in (airport.code, airport.city, airport.name, *airport.aliases)
+)
+_keys = [key for key, _ in _index]
+
+# Shorter queries are too ambiguous to correct ("Ma", "Pa" or "Le" are one edit
+# from many names); they only get prefix suggestions
+FUZZY_MIN_LENGTH = 4
+
+# City and alias keys used for typo matching, bucketed by length so only keys
+# within the edit limit are compared; codes, very short aliases and long
+# airport names are excluded.
+_fuzzy_keys = {}
+for _key in sorted({key for key, position in _index if key != normalize(AIRPORTS[position].code) and 2 < len(key) <= 20}):
+    _fuzzy_keys.setdefault(len(_key), []).append((_key, frozenset(_key)))
+
+def _edit_distance(a, b, limit):
+    """Edit distance between a and b counting adjacent swaps as one edit, or limit + 1 once it exceeds limit."""
+    before, previous = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+def _prefix_matches(query):
+    """Returns airport positions whose keys start with query, in key order."""
+    positions = []
+    i = bisect_left(_keys, query)
+    while i < len(_keys) and _keys[i].startswith(query):
+        if _index[i][1] not in positions:
+            positions.append(_index[i][1])
+        i += 1
+    return positions
+
+def _fuzzy_keys_within(query):
+    """Returns (distance, key) for city and alias keys within a small edit distance of query, closest first."""
+    if len(query) < FUZZY_MIN_LENGTH:
+        return []
+    limit = 1 if len(query) <= 6 else 2
+    scored = []
+    query_chars = set(query)
+    for length in range(len(query) - limit, len(query) + limit + 1):
+        for key, key_chars in _fuzzy_keys.get(length, ()):
+            # Each edit changes the character set by at most two characters
+            if len(query_chars ^ key_chars) > 2 * limit:
+                continue
+            # On short words a changed first letter is usually a different word ("Home" is not "Rome")
+            if len(query) <= 5 and key[0] != query[0]:
+                continue
+            distance = _edit_distance(query, key, limit)
+            if distance <= limit:
+                scored.append((distance, key))
+    return sorted(scored)
+
+def _key_positions(keys):
+    """Returns the airport positions indexed under keys, in order and without duplicates."""
+    positions = []
+    for key in keys:
+        i = bisect_left(_keys, key)
+        while i < len(_keys) and _keys[i] == key:
+            if _index[i][1] not in positions:
+                positions.append(_index[i][1])
+            i += 1
+    return positions
+
+def resolve(query):
+    """Resolves an IATA code, city, alias or airport name to an Airport, tolerating small typos.
+
+    A well-formed three-letter code that is not in the index is passed through
+    as an Airport with only its code set. Returns None when nothing matches.
+    """
+    code = (query or "").strip().upper()
+    if code in AIRPORTS_BY_CODE:
+        return AIRPORTS_BY_CODE[code]
+    key = normalize(query)
+    if not key:
+        return None
+    i = bisect_left(_keys, key)
+    if i < len(_keys) and _keys[i] == key:
+        return AIRPORTS[_index[i][1]]
+    if len(code) == 3 and code.isalpha():
+        return Airport(code, code, "", "", ())
+    scored = _fuzzy_keys_within(key)
+    # Only correct a typo when a single name is closest
+    if not scored or (len(scored) > 1 and scored[0][0] == scored[1][0]):
+        return None
+    return AIRPORTS[_key_positions([scored[0][1]])[0]]
+
+def autocomplete(query, limit=5):
+    """Returns up to limit known airports matching query by prefix, falling back to typo matches."""
+    key = normalize(query)
+    if not key:
+        return []
+    positions = _prefix_matches(key)
+    if len(positions) < limit:
+        positions += [p for p in _key_positions(k for _, k in _fuzzy_keys_within(key)) if p not in positions]
+    return [AIRPORTS[p] for p in positions[:limit]]
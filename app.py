@@ -1,16 +1,15 @@
 import streamlit as st
-import json
 from datetime import datetime
 
 from agents import (
     fetch_flights, 
     extract_cheapest_flights, 
     format_datetime, 
-    researcher, 
-    planner, 
-    hotel_restaurant_finder,
+    fetch_research,
     fetch_booking_token
 )
+from itinerary import stream_itinerary, regenerate_days
+from airports import resolve, autocomplete
 
 # Set up Streamlit UI with a travel-friendly theme
 st.set_page_config(page_title="🌍 Cleartrip Travel Planner", layout="wide")
@@ -44,8 +43,25 @@ st.markdown('<p class="subtitle">Plan your dream trip with Cleartrip! Get person
 
 # User Inputs Section
 st.markdown("### 🌍 Where are you headed?")
-source = st.text_input("🛫 Departure City (IATA Code):", "BOM")  # Example: BOM for Mumbai
-destination = st.text_input("🛬 Destination (IATA Code):", "DEL")  # Example: DEL for Delhi
+
+def airport_input(label, default):
+    """Free-text airport input resolved against the local airport index."""
+    query = st.text_input(label, default)
+    airport = resolve(query)
+    if airport and airport.known:
+        st.caption(f"✅ {airport.label}")
+    elif airport:
+        suggestions = ", ".join(f"{a.city} ({a.code})" for a in autocomplete(query))
+        st.caption(f"ℹ️ {airport.label}. {'Or did you mean: ' + suggestions + '?' if suggestions else ''}")
+    else:
+        suggestions = ", ".join(f"{a.city} ({a.code})" for a in autocomplete(query))
+        st.caption(f"⚠️ Unknown city or airport. {'Did you mean: ' + suggestions + '?' if suggestions else ''}")
+    return airport
+
+source_airport = airport_input("🛫 Departure City or Airport:", "Mumbai")  # Example: Mumbai, Bombay or BOM
+destination_airport = airport_input("🛬 Destination City or Airport:", "Delhi")  # Example: Delhi, New Delhi or DEL
+source = source_airport.code if source_airport else None
+destination = destination_airport.place if destination_airport else None
 
 st.markdown("### 📅 Plan Your Adventure")
 num_days = st.slider("🕒 Trip Duration (days):", 1, 14, 3)
@@ -66,7 +82,7 @@ st.markdown(
         border-radius: 10px; 
         margin-top: 20px;
     ">
-        <h3 style="color: black;">🌟 Your {travel_theme} to {destination} is about to begin! 🌟</h3>
+        <h3 style="color: black;">🌟 Your {travel_theme} to {destination or "your destination"} is about to begin! 🌟</h3>
         <p style="color: black;">Let's find the best flights, stays, and experiences for your unforgettable journey.</p>
     </div>
     """,
@@ -110,36 +126,76 @@ currency_converter = st.sidebar.checkbox("💱 Currency Exchange Rates")
 
 # Generate Travel Plan
 if st.button("🚀 Generate Travel Plan"):
+    if not (source_airport and destination_airport):
+        st.error("⚠️ Please enter a known city or a three-letter airport code for departure and destination.")
+        st.stop()
+
     with st.spinner("✈️ Fetching best flight options..."):
-        flight_data = fetch_flights(source, destination, departure_date, return_date)
+        flight_data = fetch_flights(source, destination_airport.code, departure_date, return_date)
         cheapest_flights = extract_cheapest_flights(flight_data)
+        booking_tokens = [fetch_booking_token(flight, flight_data) for flight in cheapest_flights]
 
     # AI Processing
     with st.spinner("🔍 Researching best attractions & activities..."):
-        research_prompt = (
-            f"Research the best attractions and activities in {destination} for a {num_days}-day {travel_theme.lower()} trip. "
-            f"The traveler enjoys: {activity_preferences}. Budget: {budget}. Flight Class: {flight_class}. "
-            f"Hotel Rating: {hotel_rating}. Visa Requirement: {visa_required}. Travel Insurance: {travel_insurance}."
-        )
-        research_results = researcher.run(research_prompt, stream=False)
+        research_results = fetch_research("research", {
+            "destination": destination,
+            "travel_theme": travel_theme,
+        })
 
     with st.spinner("🏨 Searching for hotels & restaurants..."):
-        hotel_restaurant_prompt = (
-            f"Find the best hotels and restaurants near popular attractions in {destination} for a {travel_theme.lower()} trip. "
-            f"Budget: {budget}. Hotel Rating: {hotel_rating}. Preferred activities: {activity_preferences}."
-        )
-        hotel_restaurant_results = hotel_restaurant_finder.run(hotel_restaurant_prompt, stream=False)
+        hotel_restaurant_results = fetch_research("hotels_restaurants", {
+            "destination": destination,
+            "travel_theme": travel_theme,
+            "budget": budget,
+            "hotel_rating": hotel_rating,
+        })
+
+    st.session_state["trip"] = {
+        "destination": destination,
+        "num_days": num_days,
+        "travel_theme": travel_theme,
+        "activity_preferences": activity_preferences,
+        "budget": budget,
+        "flight_class": flight_class,
+        "hotel_rating": hotel_rating,
+        "visa_required": visa_required,
+        "travel_insurance": travel_insurance,
+        "research": research_results,
+        "flights": cheapest_flights,
+        "hotels": hotel_restaurant_results,
+    }
+    st.session_state["booking_tokens"] = booking_tokens
+    st.session_state["failed_days"] = set()
+
+def render_day(slot, day_plan):
+    """Renders a single itinerary day into its placeholder."""
+    with slot.container():
+        st.markdown(f"#### Day {day_plan.day}: {day_plan.title}")
+        for activity in day_plan.activities:
+            st.markdown(
+                f"- **{activity.time}** · {activity.title} ({activity.location}, {activity.duration_minutes} min, "
+                f"₹{activity.estimated_cost:.0f}) — {activity.description}"
+            )
+        st.markdown(f"🚕 **Transport:** {day_plan.transport}")
+        if day_plan.notes:
+            st.markdown(f"💡 {day_plan.notes}")
+        st.markdown(f"💰 **Estimated day total:** ₹{day_plan.total_cost:.0f}")
+
+def render_day_result(slot, day, day_plan, error, failed_days):
+    """Renders a generated day, or an error for a day that could not be planned."""
+    if day_plan:
+        failed_days.discard(day)
+        render_day(slot, day_plan)
+    else:
+        failed_days.add(day)
+        slot.error(f"⚠️ Couldn't plan day {day}: {error}. Use Regenerate Selected Days to try again.")
+
+# Display Results
+if "trip" in st.session_state:
+    trip = st.session_state["trip"]
+    booking_tokens = st.session_state["booking_tokens"]
+    cheapest_flights = trip["flights"]
 
-    with st.spinner("🗺️ Creating your personalized itinerary..."):
-        planning_prompt = (
-            f"Based on the following data, create a {num_days}-day itinerary for a {travel_theme.lower()} trip to {destination}. "
-            f"The traveler enjoys: {activity_preferences}. Budget: {budget}. Flight Class: {flight_class}. Hotel Rating: {hotel_rating}. "
-            f"Visa Requirement: {visa_required}. Travel Insurance: {travel_insurance}. Research: {research_results.content}. "
-            f"Flights: {json.dumps(cheapest_flights)}. Hotels & Restaurants: {hotel_restaurant_results.content}."
-        )
-        itinerary = planner.run(planning_prompt, stream=False)
-
-    # Display Results
     st.subheader("✈️ Cheapest Flight Options")
     if cheapest_flights:
         cols = st.columns(len(cheapest_flights))
@@ -158,7 +214,7 @@ if st.button("🚀 Generate Travel Plan"):
                 departure_time = format_datetime(departure.get("time", "N/A"))
                 arrival_time = format_datetime(arrival.get("time", "N/A"))
                 
-                booking_token = fetch_booking_token(flight, flight_data)
+                booking_token = booking_tokens[idx]
                 booking_link = f"https://www.google.com/travel/flights?tfs={booking_token}" if booking_token else "#"
                 
                 # Flight card layout
@@ -198,9 +254,32 @@ if st.button("🚀 Generate Travel Plan"):
         st.warning("⚠️ No flight data available.")
 
     st.subheader("🏨 Hotels & Restaurants")
-    st.write(hotel_restaurant_results.content)
+    st.write(trip["hotels"])
 
     st.subheader("🗺️ Your Personalized Itinerary")
-    st.write(itinerary.content)
+    st.markdown("##### ✏️ Change part of your trip")
+    regen_cols = st.columns(3)
+    with regen_cols[0]:
+        regen_start = st.number_input("From day", 1, trip["num_days"], 1)
+    with regen_cols[1]:
+        regen_end = st.number_input("To day", regen_start, trip["num_days"], regen_start)
+    with regen_cols[2]:
+        regen_feedback = st.text_input("What should change?", "")
+    regenerate = st.button("🔁 Regenerate Selected Days")
 
-    st.success("✅ Travel plan generated successfully!")
\ No newline at end of file
+    day_slots = [st.empty() for _ in range(trip["num_days"])]
+    with st.spinner("🗺️ Creating your personalized itinerary..."):
+        # Failed days are only retried through Regenerate, not on every rerun
+        failed_days = st.session_state["failed_days"]
+        for day in failed_days:
+            day_slots[day - 1].error(f"⚠️ Couldn't plan day {day}. Use Regenerate Selected Days to try again.")
+        for day, day_plan, error in stream_itinerary(trip, skip_days=set(failed_days)):
+            render_day_result(day_slots[day - 1], day, day_plan, error, failed_days)
+        if regenerate:
+            for day, day_plan, error in regenerate_days(trip, int(regen_start), int(regen_end), regen_feedback):
+                render_day_result(day_slots[day - 1], day, day_plan, error, failed_days)
+
+    if failed_days:
+        st.warning(f"⚠️ Travel plan generated, but {len(failed_days)} day(s) could not be planned.")
+    else:
+        st.success("✅ Travel plan generated successfully!")
\ No newline at end of file
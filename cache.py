@@ -0,0 +1,74 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+CACHE_DB = os.getenv("CACHE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache.db"))
+
+class TTLCache:
+    """A small cache whose entries expire after a fixed TTL.
+
+    Entries live in a SQLite file shared by the app, the voice assistant and the
+    cache warmer, so anything warmed by one process is served warm to the others.
+    Keys and values must be JSON-serializable.
+    """
+
+    def __init__(self, name, ttl_seconds, path=CACHE_DB):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (name TEXT, key TEXT, value TEXT, expires_at REAL, PRIMARY KEY (name, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _dump_key(key):
+        return json.dumps(key, sort_keys=True, default=str)
+
+    def get(self, key):
+        """Returns the cached value, or None if it is missing or expired."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM cache WHERE name = ? AND key = ? AND expires_at > ?",
+                (self.name, self._dump_key(key), time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value):
+        """Stores a value for the configured TTL, deleting expired entries so the file stays bounded."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (name, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.name, self._dump_key(key), json.dumps(value), time.time() + self.ttl_seconds),
+            )
+
+    def expires_in(self, key):
+        """Returns the seconds left before the entry expires, or None if it is missing or expired."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT expires_at FROM cache WHERE name = ? AND key = ?", (self.name, self._dump_key(key))
+            ).fetchone()
+        if not row or row[0] <= time.time():
+            return None
+        return row[0] - time.time()
+
+    def purge_expired(self):
+        """Deletes expired entries of every cache in the file. Returns the number of rows removed."""
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def __contains__(self, key):
+        return self.expires_in(key) is not None
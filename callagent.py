@@ -1,10 +1,16 @@
 import os
 import json
+import time
+import asyncio
 import uvicorn
 import google.generativeai as genai
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.responses import Response
 from dotenv import load_dotenv
+from datetime import date
+
+from agents import fetch_flights, extract_cheapest_flights, summarize_flights, flight_cache, flight_cache_key
+from airports import resolve
 
 # Load environment variables from .env file
 load_dotenv()
@@ -24,7 +30,31 @@ Please adhere to the following rules:
 1. Provide clear, concise, and direct answers.
 2. Spell out all numbers (e.g., say 'one thousand two hundred' instead of 1200).
 3. Do not use any special characters like asterisks, bullet points, or emojis.
-4. Keep the conversation natural and engaging."""
+4. Keep the conversation natural and engaging.
+5. For questions about flights, prices or schedules, always use the lookup_flights tool instead of guessing. Pass city names or airport codes as the caller said them and convert relative dates to YYYY-MM-DD."""
+
+# Hard latency budget for a tool call, so the caller is never left in silence
+FLIGHT_TOOL_TIMEOUT = float(os.getenv("FLIGHT_TOOL_TIMEOUT", "4"))
+FILLER_TOKEN = "Let me check the flights for you."
+
+FLIGHT_TOOL = {
+    "function_declarations": [
+        {
+            "name": "lookup_flights",
+            "description": "Looks up the cheapest flights between two airports on a given date.",
+            "parameters": {
+                "type": "OBJECT",
+                "properties": {
+                    "source": {"type": "STRING", "description": "Departure city or airport code, e.g. Mumbai or BOM."},
+                    "destination": {"type": "STRING", "description": "Arrival city or airport code, e.g. Delhi or DEL."},
+                    "departure_date": {"type": "STRING", "description": "Departure date in YYYY-MM-DD format."},
+                    "return_date": {"type": "STRING", "description": "Optional return date in YYYY-MM-DD format."},
+                },
+                "required": ["source", "destination", "departure_date"],
+            },
+        }
+    ]
+}
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 if not GOOGLE_API_KEY:
@@ -32,20 +62,99 @@ if not GOOGLE_API_KEY:
 
 genai.configure(api_key=GOOGLE_API_KEY)
 
-model = genai.GenerativeModel(
-    model_name='gemini-1.5-flash',
-    system_instruction=SYSTEM_PROMPT
-)
+def build_model():
+    """Creates the voice model with today's date so relative dates can be resolved."""
+    return genai.GenerativeModel(
+        model_name='gemini-1.5-flash',
+        system_instruction=f"{SYSTEM_PROMPT}\nToday's date is {date.today().isoformat()}.",
+        tools=[FLIGHT_TOOL]
+    )
 
 sessions = {}
 
 # Create FastAPI app
 app = FastAPI()
 
-async def gemini_response(chat_session, user_prompt):
-    """Get a response from the Gemini API and stream it."""
+def parse_travel_dates(departure_date, return_date=None):
+    """Parses the model's YYYY-MM-DD dates, rejecting malformed and past dates before any API call."""
+    try:
+        departure = date.fromisoformat(str(departure_date))
+        returning = date.fromisoformat(str(return_date)) if return_date else None
+    except ValueError:
+        raise ValueError("Dates must be in YYYY-MM-DD format. Work out the exact date and try again.")
+    if departure < date.today():
+        raise ValueError("The departure date is in the past. Ask the caller for a future date.")
+    if returning and returning < departure:
+        raise ValueError("The return date is before the departure date. Ask the caller to confirm the dates.")
+    return departure, returning
+
+async def lookup_flights(source, destination, departure_date, return_date=None):
+    """Runs the flight search off the event loop and returns a compact summary.
+
+    On timeout the search keeps running in its thread and still warms the cache
+    for the caller's next question.
+    """
+    source_airport, destination_airport = resolve(source), resolve(destination)
+    if not (source_airport and destination_airport):
+        return {"error": "Unknown city or airport. Ask the caller to repeat the city name."}
+    try:
+        departure_date, return_date = parse_travel_dates(departure_date, return_date)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    def search():
+        flight_data = fetch_flights(source_airport.code, destination_airport.code, departure_date, return_date)
+        return summarize_flights(extract_cheapest_flights(flight_data))
+
+    try:
+        flights = await asyncio.wait_for(asyncio.to_thread(search), timeout=FLIGHT_TOOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        return {"error": "The flight search is taking longer than usual. Ask the caller to try again in a moment."}
+    if not flights:
+        return {"error": "No flights found for this route and date."}
+    return {"flights": flights}
+
+def needs_filler(args):
+    """Checks whether a lookup will go to SerpApi, i.e. is neither rejected locally nor served warm from the cache."""
+    source_airport, destination_airport = resolve(args.get("source")), resolve(args.get("destination"))
+    if not (source_airport and destination_airport):
+        return False
+    try:
+        departure_date, return_date = parse_travel_dates(args.get("departure_date"), args.get("return_date"))
+    except ValueError:
+        return False
+    cache_key = flight_cache_key(source_airport.code, destination_airport.code, departure_date, return_date)
+    return cache_key not in flight_cache
+
+async def gemini_response(chat_session, user_prompt, websocket):
+    """Get a response from the Gemini API, running any requested tool calls.
+
+    Returns the response text and the time spent in tools, in seconds.
+    """
+    tool_latency = 0.0
     response = await chat_session.send_message_async(user_prompt)
-    return response.text
+    function_calls = [part.function_call for part in response.parts if part.function_call]
+    while function_calls:
+        function_responses = []
+        for function_call in function_calls:
+            args = dict(function_call.args)
+            if function_call.name != "lookup_flights":
+                result = {"error": f"Unknown tool {function_call.name}."}
+            else:
+                # The cache check reads SQLite, so keep it off the event loop
+                if await asyncio.to_thread(needs_filler, args):
+                    await websocket.send_text(json.dumps({"type": "text", "token": FILLER_TOKEN, "last": False}))
+                start = time.perf_counter()
+                result = await lookup_flights(
+                    args.get("source"), args.get("destination"), args.get("departure_date"), args.get("return_date")
+                )
+                tool_latency += time.perf_counter() - start
+            function_responses.append(
+                genai.protos.Part(function_response=genai.protos.FunctionResponse(name=function_call.name, response=result))
+            )
+        response = await chat_session.send_message_async(function_responses)
+        function_calls = [part.function_call for part in response.parts if part.function_call]
+    return response.text, tool_latency
 
 @app.post("/twiml")
 async def twiml_endpoint():
@@ -74,7 +183,7 @@ async def websocket_endpoint(websocket: WebSocket):
                 call_sid = message["callSid"]
                 print(f"Setup for call: {call_sid}")
                 # Start a new chat session for this call
-                sessions[call_sid] = model.start_chat(history=[])
+                sessions[call_sid] = build_model().start_chat(history=[])
                 
             elif message["type"] == "prompt":
                 if not call_sid or call_sid not in sessions:
@@ -85,7 +194,9 @@ async def websocket_endpoint(websocket: WebSocket):
                 print(f"Processing prompt: {user_prompt}")
                 
                 chat_session = sessions[call_sid]
-                response_text = await gemini_response(chat_session, user_prompt)
+                turn_start = time.perf_counter()
+                response_text, tool_latency = await gemini_response(chat_session, user_prompt, websocket)
+                turn_latency = time.perf_counter() - turn_start
 
                 await websocket.send_text(
                     json.dumps({
@@ -95,6 +206,7 @@ async def websocket_endpoint(websocket: WebSocket):
                     })
                 )
                 print(f"Sent response: {response_text}")
+                print(f"Turn latency for call {call_sid}: {turn_latency * 1000:.0f} ms total, {tool_latency * 1000:.0f} ms in tools")
                 
             elif message["type"] == "interrupt":
                 print(f"Handling interruption for call {call_sid}.")
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+from pydantic import ValidationError
+
+from agents import planner, DayPlan, summarize_flights
+from cache import TTLCache
+
+ITINERARY_CACHE_TTL = int(os.getenv("ITINERARY_CACHE_TTL", "86400"))
+# Most characters of research and hotel text passed to each per-day planner call
+PLANNER_CONTEXT_CHARS = int(os.getenv("PLANNER_CONTEXT_CHARS", "3000"))
+
+# Generated days keyed by (trip key, day number), so editing one day never
+# regenerates the rest of the trip.
+day_cache = TTLCache("itinerary_days", ITINERARY_CACHE_TTL)
+
+def trip_key(trip):
+    """Builds a stable cache key from the trip details."""
+    payload = json.dumps(trip, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def summarize_day(day_plan):
+    """Returns a one-line summary of a day, used as context for other days."""
+    titles = ", ".join(activity.title for activity in day_plan.activities)
+    return f"Day {day_plan.day} ({day_plan.title}): {titles}. Cost: {day_plan.total_cost:.0f} INR."
+
+def get_cached_days(trip):
+    """Returns the cached days of a trip, keyed by day number."""
+    key = trip_key(trip)
+    days = {}
+    for day in range(1, trip["num_days"] + 1):
+        cached = day_cache.get((key, day))
+        if cached is not None:
+            days[day] = DayPlan.model_validate(cached)
+    return days
+
+def _day_slice(text, day, num_days, limit=PLANNER_CONTEXT_CHARS):
+    """Returns the day's share of text: its lines split evenly across the trip, cut to limit characters.
+
+    Each day sees different researched places, so a long trip uses the whole
+    research instead of every day drawing on the same first few items.
+    """
+    lines = [line for line in str(text or "").splitlines() if line.strip()]
+    start, end = (day - 1) * len(lines) // num_days, day * len(lines) // num_days
+    # With fewer lines than days, neighbouring days share a line rather than getting none
+    chunk = "\n".join(lines[start:max(end, start + 1)])
+    if len(chunk) <= limit:
+        return chunk
+    cut = chunk[:limit]
+    return cut[:cut.rfind("\n")] if "\n" in cut else cut
+
+def _build_day_prompt(trip, day, context_days, feedback=None):
+    """Builds the planner prompt for a single day, with only the context that day needs."""
+    other_days = "\n".join(summarize_day(context_days[d]) for d in sorted(context_days) if d != day)
+    prompt = (
+        f"Plan day {day} of a {trip['num_days']}-day itinerary for a {trip['travel_theme'].lower()} trip to {trip['destination']}. "
+        f"The traveler enjoys: {trip['activity_preferences']}. Budget: {trip['budget']}. Flight Class: {trip['flight_class']}. "
+        f"Hotel Rating: {trip['hotel_rating']}. Visa Requirement: {trip['visa_required']}. Travel Insurance: {trip['travel_insurance']}. "
+        f"Research for this day: {_day_slice(trip['research'], day, trip['num_days'])}. "
+        f"Hotels & Restaurants for this day: {_day_slice(trip['hotels'], day, trip['num_days'])}."
+    )
+    # Flight times only shape the arrival and departure days
+    if day in (1, trip["num_days"]):
+        prompt += f" Flights: {json.dumps(summarize_flights(trip['flights']))}."
+    if other_days:
+        prompt += f"\nOther days already planned:\n{other_days}"
+    if feedback:
+        prompt += f"\nTraveler feedback for this day: {feedback}"
+    return prompt
+
+def generate_day(trip, day, context_days, feedback=None):
+    """Generates, validates and caches a single itinerary day."""
+    response = planner.run(_build_day_prompt(trip, day, context_days, feedback), stream=False)
+    content = response.content
+    try:
+        if isinstance(content, DayPlan):
+            day_plan = content
+        elif isinstance(content, dict):
+            day_plan = DayPlan.model_validate(content)
+        else:
+            day_plan = DayPlan.model_validate_json(content)
+    except (ValidationError, TypeError) as e:
+        raise ValueError(f"Planner returned an invalid plan for day {day}: {e}") from e
+    day_plan.day = day
+    day_cache.set((trip_key(trip), day), day_plan.model_dump())
+    return day_plan
+
+def _try_generate_day(trip, day, context_days, feedback=None):
+    """Generates a day, returning (day_plan, None) or (None, error) so one bad day does not stop the rest."""
+    try:
+        return generate_day(trip, day, context_days, feedback), None
+    except Exception as e:
+        print(f"Error planning day {day}: {e}")
+        return None, e
+
+def stream_itinerary(trip, skip_days=()):
+    """Yields (day, day_plan, error) for each day as soon as it is cached or generated.
+
+    Uncached days in skip_days, e.g. days that already failed, are not generated again.
+    """
+    days = get_cached_days(trip)
+    for day in range(1, trip["num_days"] + 1):
+        if day in days:
+            yield day, days[day], None
+        elif day not in skip_days:
+            day_plan, error = _try_generate_day(trip, day, days)
+            if day_plan:
+                days[day] = day_plan
+            yield day, day_plan, error
+
+def regenerate_days(trip, start, end=None, feedback=None):
+    """Regenerates days start..end (inclusive), yielding (day, day_plan, error) as each completes.
+
+    The remaining days are passed to the planner as one-line summaries.
+    """
+    end = end or start
+    if not 1 <= start <= end <= trip["num_days"]:
+        raise ValueError(f"Invalid day range {start}-{end} for a {trip['num_days']}-day trip.")
+    days = get_cached_days(trip)
+    for day in range(start, end + 1):
+        day_plan, error = _try_generate_day(trip, day, days, feedback)
+        if day_plan:
+            days[day] = day_plan
+        yield day, day_plan, error
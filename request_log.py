@@ -0,0 +1,73 @@
+import json
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+# One JSON-lines file per day, so old days can be dropped and only the days
+# that are needed are read back.
+REQUEST_LOG_DIR = os.getenv("REQUEST_LOG_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "request_logs"))
+
+_lock = threading.Lock()
+
+def _log_file(day, log_dir=REQUEST_LOG_DIR):
+    return os.path.join(log_dir, f"requests-{day.isoformat()}.jsonl")
+
+def _log_days(log_dir=REQUEST_LOG_DIR):
+    """Returns (day, path) for every daily log file, oldest first."""
+    if not os.path.isdir(log_dir):
+        return []
+    days = []
+    for filename in os.listdir(log_dir):
+        if filename.startswith("requests-") and filename.endswith(".jsonl"):
+            try:
+                days.append((date.fromisoformat(filename[len("requests-"):-len(".jsonl")]), os.path.join(log_dir, filename)))
+            except ValueError:
+                continue
+    return sorted(days)
+
+def log_request(kind, params, warm, log_dir=REQUEST_LOG_DIR):
+    """Appends one live request and whether it was served from a warm cache."""
+    ts = time.time()
+    entry = {"ts": ts, "kind": kind, "params": params, "warm": warm}
+    line = json.dumps(entry, default=str)
+    try:
+        with _lock:
+            os.makedirs(log_dir, exist_ok=True)
+            with open(_log_file(date.fromtimestamp(ts), log_dir), "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except OSError as e:
+        print(f"Error writing request log: {e}")
+
+def read_requests(since=None, log_dir=REQUEST_LOG_DIR):
+    """Returns logged requests, optionally only those newer than the since timestamp.
+
+    Daily files older than since are skipped without being read.
+    """
+    first_day = date.fromtimestamp(since) if since is not None else date.min
+    entries = []
+    for day, path in _log_days(log_dir):
+        if day < first_day:
+            continue
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if since is None or entry["ts"] >= since:
+                    entries.append(entry)
+    return entries
+
+def prune_requests(keep_days, log_dir=REQUEST_LOG_DIR):
+    """Deletes daily log files older than keep_days. Returns the number of files removed."""
+    cutoff = date.today() - timedelta(days=keep_days)
+    removed = 0
+    for day, path in _log_days(log_dir):
+        if day < cutoff:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError as e:
+                print(f"Error removing request log {path}: {e}")
+    return removed
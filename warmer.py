@@ -0,0 +1,243 @@
+import argparse
+import inspect
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+from agents import (
+    flight_cache,
+    flight_cache_key,
+    flight_params,
+    search_flights,
+    extract_cheapest_flights,
+    booking_token_cache,
+    search_booking_token,
+    research_cache,
+    run_research,
+    RESEARCH_TASKS
+)
+from request_log import read_requests, prune_requests
+from cache import TTLCache
+
+# API calls the warmer may spend per day; an agent run is charged WARMER_RESEARCH_COST
+WARMER_QUOTA = int(os.getenv("WARMER_QUOTA", "300"))
+WARMER_RESEARCH_COST = int(os.getenv("WARMER_RESEARCH_COST", "3"))
+WARMER_INTERVAL = int(os.getenv("WARMER_INTERVAL", "900"))
+WARMER_OFF_PEAK_HOURS = os.getenv("WARMER_OFF_PEAK_HOURS", "0-6")
+WARMER_LOOKBACK_DAYS = float(os.getenv("WARMER_LOOKBACK_DAYS", "7"))
+WARMER_HALF_LIFE_DAYS = float(os.getenv("WARMER_HALF_LIFE_DAYS", "2"))
+# Minimum recency-weighted request count for an entry to be worth warming (about two recent requests)
+WARMER_MIN_DEMAND = float(os.getenv("WARMER_MIN_DEMAND", "1.5"))
+# Entries expiring before the next cycle are refreshed now
+WARMER_REFRESH_MARGIN = int(os.getenv("WARMER_REFRESH_MARGIN", str(WARMER_INTERVAL)))
+# During peak hours only this many of the most demanded entries are kept warm
+WARMER_PEAK_TOP_N = int(os.getenv("WARMER_PEAK_TOP_N", "10"))
+
+# API calls spent per day, shared across warmer restarts
+quota_usage = TTLCache("warmer_quota", 2 * 86400)
+
+def is_off_peak(hour, hours=WARMER_OFF_PEAK_HOURS):
+    """Checks whether an hour falls in the off-peak window, e.g. "0-6" or "22-5"."""
+    start, end = (int(h) for h in hours.split("-"))
+    if start <= end:
+        return start <= hour <= end
+    return hour >= start or hour <= end
+
+def seconds_until_peak(now_dt, hours=WARMER_OFF_PEAK_HOURS):
+    """Returns the seconds from now_dt until the off-peak window ends."""
+    peak_hour = (int(hours.split("-")[1]) + 1) % 24
+    peak_start = now_dt.replace(hour=peak_hour, minute=0, second=0, microsecond=0)
+    if peak_start <= now_dt:
+        peak_start += timedelta(days=1)
+    return (peak_start - now_dt).total_seconds()
+
+def next_sleep(now_dt):
+    """Returns the seconds to sleep so that one cycle starts inside the last off-peak interval before peak."""
+    if is_off_peak(now_dt.hour):
+        until_window = seconds_until_peak(now_dt) - WARMER_INTERVAL
+        if until_window > 0:
+            return min(WARMER_INTERVAL, until_window)
+    return WARMER_INTERVAL
+
+def quota_left(today=None):
+    """Returns the API calls left in today's warmer budget."""
+    today = (today or date.today()).isoformat()
+    return max(WARMER_QUOTA - (quota_usage.get(today) or 0), 0)
+
+def record_quota_spent(spent, today=None):
+    """Adds spent API calls to today's warmer budget usage."""
+    today = (today or date.today()).isoformat()
+    quota_usage.set(today, (quota_usage.get(today) or 0) + spent)
+
+def demand_weight(ts, now):
+    """Weights a logged request so that recent requests count more."""
+    age_days = (now - ts) / 86400
+    return 0.5 ** (age_days / WARMER_HALF_LIFE_DAYS)
+
+def predict_flight_demand(entries, now):
+    """Predicts demand per concrete flight search from logged flight requests.
+
+    Each request counts for its exact dates, if still ahead, and for the same
+    date window (days ahead and trip length) projected from today.
+    """
+    demand = Counter()
+    today = date.fromtimestamp(now)
+    for entry in entries:
+        if entry["kind"] != "flights":
+            continue
+        params = entry["params"]
+        try:
+            departure = date.fromisoformat(params["departure_date"])
+            return_date = date.fromisoformat(params["return_date"]) if params.get("return_date") else None
+        except (KeyError, TypeError, ValueError):
+            continue
+        lead_days = (departure - date.fromtimestamp(entry["ts"])).days
+        if lead_days < 0:
+            continue
+        projected = today + timedelta(days=lead_days)
+        targets = {(departure, return_date), (projected, projected + (return_date - departure) if return_date else None)}
+        for target_departure, target_return in targets:
+            if target_departure >= today:
+                key = flight_cache_key(params["source"], params["destination"], target_departure, target_return)
+                demand[key] += demand_weight(entry["ts"], now)
+    return demand
+
+def predict_research_demand(entries, now):
+    """Predicts demand per research kind and parameter set, e.g. destination and theme, from logged research requests."""
+    demand = Counter()
+    for entry in entries:
+        if entry["kind"] not in RESEARCH_TASKS:
+            continue
+        _, build_prompt = RESEARCH_TASKS[entry["kind"]]
+        # Skip requests logged with parameters the prompt no longer takes
+        if set(entry["params"]) == set(inspect.signature(build_prompt).parameters):
+            demand[(entry["kind"], json.dumps(entry["params"], sort_keys=True))] += demand_weight(entry["ts"], now)
+    return demand
+
+def warm_flights(cache_key, quota):
+    """Warms a flight search and the booking tokens of its cheapest flights. Returns the API calls spent."""
+    results = search_flights(*cache_key)
+    spent = 1
+    if not results.get("best_flights"):
+        return spent
+    flight_cache.set(cache_key, results)
+    params = flight_params(*cache_key)
+    for flight in extract_cheapest_flights(results):
+        departure_token = flight.get("departure_token")
+        if spent >= quota:
+            break
+        if not departure_token or departure_token in booking_token_cache:
+            continue
+        booking_token = search_booking_token(flight, params)
+        spent += 1
+        if booking_token:
+            booking_token_cache.set(departure_token, booking_token)
+    return spent
+
+def warm_research(kind, params):
+    """Warms a research agent run. Returns the API calls charged."""
+    try:
+        content = run_research(kind, params)
+    except Exception as e:
+        print(f"Error warming {kind}: {e}")
+        return WARMER_RESEARCH_COST
+    if content:
+        research_cache.set((kind, params), content)
+    return WARMER_RESEARCH_COST
+
+def warm_cycle(quota, now=None, include_flights=True, top_n=None):
+    """Warms missing and soon-to-expire entries in order of predicted demand, within the quota.
+
+    Flight jobs are skipped unless include_flights is set, and only the top_n
+    most demanded jobs are considered when top_n is given. Spend is recorded
+    against the daily budget after every job. Returns the number of entries
+    warmed and the API calls spent.
+    """
+    now = now or time.time()
+    flight_cache.purge_expired()
+    prune_requests(WARMER_LOOKBACK_DAYS)
+    entries = read_requests(since=now - WARMER_LOOKBACK_DAYS * 86400)
+    jobs = [(weight, "flights", key) for key, weight in predict_flight_demand(entries, now).items()]
+    jobs += [(weight, kind, params) for (kind, params), weight in predict_research_demand(entries, now).items()]
+    jobs.sort(key=lambda job: job[0], reverse=True)
+    jobs = [job for job in jobs if job[0] >= WARMER_MIN_DEMAND][:top_n]
+
+    warmed, spent = 0, 0
+    for weight, kind, key in jobs:
+        if kind == "flights":
+            if not include_flights:
+                continue
+            cache, cache_key, cost = flight_cache, key, 1
+        else:
+            params = json.loads(key)
+            cache, cache_key, cost = research_cache, (kind, params), WARMER_RESEARCH_COST
+        expires_in = cache.expires_in(cache_key)
+        if expires_in is not None and expires_in > WARMER_REFRESH_MARGIN:
+            continue
+        if spent + cost > quota:
+            continue
+        if kind == "flights":
+            job_spent = warm_flights(cache_key, quota - spent)
+        else:
+            job_spent = warm_research(kind, params)
+        record_quota_spent(job_spent)
+        spent += job_spent
+        warmed += 1
+    return warmed, spent
+
+def coverage(entries):
+    """Returns (warm, total) live requests per kind."""
+    totals = defaultdict(lambda: [0, 0])
+    for entry in entries:
+        totals[entry["kind"]][0] += bool(entry["warm"])
+        totals[entry["kind"]][1] += 1
+    return {kind: tuple(counts) for kind, counts in totals.items()}
+
+def report_coverage(hours=24):
+    """Prints the share of live requests served warm over the last hours."""
+    stats = coverage(read_requests(since=time.time() - hours * 3600))
+    if not stats:
+        print(f"Coverage (last {hours}h): no requests logged")
+        return
+    warm = sum(w for w, _ in stats.values())
+    total = sum(t for _, t in stats.values())
+    details = ", ".join(f"{kind} {w}/{t} ({w / t:.0%})" for kind, (w, t) in sorted(stats.items()))
+    print(f"Coverage (last {hours}h): {warm}/{total} ({warm / total:.0%}) served warm — {details}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-populates the flight, booking-token and research caches.")
+    parser.add_argument("--once", action="store_true", help="Run a single warm cycle now, regardless of off-peak hours.")
+    parser.add_argument("--report", action="store_true", help="Only print cache coverage.")
+    args = parser.parse_args()
+
+    if args.report:
+        report_coverage()
+        return
+    while True:
+        try:
+            now_dt = datetime.now()
+            if args.once:
+                include_flights, top_n = True, None
+            elif is_off_peak(now_dt.hour):
+                # Flights expire within FLIGHT_CACHE_TTL, so only the last off-peak
+                # cycle warms them, leaving them fresh when peak traffic starts
+                include_flights, top_n = seconds_until_peak(now_dt) <= WARMER_INTERVAL, None
+            else:
+                include_flights, top_n = True, WARMER_PEAK_TOP_N
+            quota = quota_left()
+            if quota > 0:
+                warmed, spent = warm_cycle(quota, include_flights=include_flights, top_n=top_n)
+                print(f"Warmed {warmed} entries using {spent} API calls, {quota - spent}/{WARMER_QUOTA} left today")
+            else:
+                print(f"Daily warmer budget of {WARMER_QUOTA} API calls used up")
+            report_coverage()
+        except Exception as e:
+            print(f"Error in warm cycle: {e}")
+        if args.once:
+            break
+        time.sleep(next_sleep(datetime.now()))
+
+if __name__ == "__main__":
+    main()